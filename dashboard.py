@@ -4,63 +4,117 @@
 from dandi.dandiapi import DandiAPIClient 
 # panda
 import pandas as pd
+# numpy
+import numpy as np
 # bokeh
-from bokeh.plotting import figure, show
-from bokeh.models import ColumnDataSource, TapTool, CustomJS, HoverTool
-from bokeh.io import output_file
-from bokeh.transform import factor_cmap
+from bokeh.plotting import figure
+from bokeh.models import ColumnDataSource, TapTool, CustomJS, CustomJSHover, HoverTool
+from bokeh.io import save
+from bokeh.resources import Resources
+from bokeh.settings import settings
 from bokeh.palettes import Category20, Category10
+# argparse
+import argparse
 # pickle
 import pickle 
  # os
 import os
+# shutil
+import shutil
 # json
 import json 
+from json.encoder import encode_basestring_ascii
+# re
+import re
 # urllib
 from urllib.parse import quote
+# concurrent.futures
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+# functools
+import functools
+# itertools
+from itertools import cycle, islice, repeat
 # jinja2
-from jinja2 import Environment, FileSystemLoader 
+from jinja2 import Template
 
 
 
 ##################### Helper Functions
 
-######################## Section: 1. Data Gathering ########################
+######################## Caching ########################
+
+
+# Version of the cached objects, part of their file names: bump it whenever
+# the content of a cached object changes, so that older cache files are not loaded
+CACHE_VERSION = "v1"
 
 
-def extract_subject_from_path(path_parts):
+def read_cached(path):
     """
-    Extract the subject ID from the parts of the path if the directory contains 'sub-' (subject identifier).
-    Assumes the path follows a structure where subject IDs are in directories like 'sub-01', 'sub-02', etc.
+    Read an object cached by write_cached().
 
-    Args:
-        path_parts (list): List of directory and file parts obtained from splitting the path by '/'.
+    Parameters:
+    path (str): The path of the cache file, a Feather file for a DataFrame or a pickle file otherwise.
 
     Returns:
-        str: Subject ID if found, otherwise None.
+    The cached object.
     """
-    for val in path_parts[:-1]:  # Loop through all parts except the last (which is usually the file name)
-        if val.startswith("sub-"):  # Check if part starts with 'sub-'
-            return val.split("sub-")[1]  # Return the part after 'sub-'
-    return None  # If no 'sub-' part found, return None
+    if path.endswith(".feather"):
+        # DataFrames are read back from Arrow's columnar format, much faster than unpickling them
+        return pd.read_feather(path)
+    with open(path, 'rb') as file:
+        return pickle.load(file)
 
 
-def parse_asset_filename(assetname):
+def write_cached(obj, path):
     """
-    Extract key-value pairs from the asset file name. The file name parts are assumed to follow
-    a 'key-value' format, where the key and value are separated by a hyphen (e.g., 'sub-01', 'task-rest').
-    
-    Args:
-        assetname (str): The file name of the asset.
-    
+    Cache an object to `path`: a DataFrame to a Feather file, any other object to a pickle file.
+
+    Parameters:
+    obj: The object to cache.
+    path (str): The path of the cache file, ending with '.feather' for a DataFrame.
+    """
+    if path.endswith(".feather"):
+        obj.to_feather(path)
+        return
+    with open(path, 'wb') as file:
+        pickle.dump(obj, file)
+
+
+def load_or_compute(paths, compute, force=False):
+    """
+    Load the cached object(s) from `paths` if they all exist, otherwise compute them and cache them to `paths`.
+    The computed objects are returned as is, without reading them back from the files.
+
+    Parameters:
+    paths (str or tuple): The path of the cache file, or a tuple of paths when `compute` returns
+        a tuple of objects, each cached to its own file (see write_cached()).
+    compute (callable): Function without arguments computing the object(s).
+    force (bool): If True, always compute (and save) the object(s), ignoring existing files.
+
     Returns:
-        dict: A dictionary of key-value pairs extracted from the file name.
+    The loaded or computed object, or tuple of objects.
     """
-    return {
-        key_value.split("-")[0]: "-".join(key_value.split("-")[1:])  # Split key-value pairs by '-'
-        for key_value in assetname.split(".")[0].split("_")  # First, remove the file extension, then split by '_'
-        if "-" in key_value  # Only keep parts that contain a '-'
-    }
+    if isinstance(paths, str):
+        return load_or_compute((paths,), lambda: (compute(),), force)[0]
+
+    if not force and all(os.path.exists(path) for path in paths):
+        # Load the objects from the saved files
+        return tuple(read_cached(path) for path in paths)
+
+    objs = compute()
+    # Saving the objects
+    for obj, path in zip(objs, paths):
+        write_cached(obj, path)
+    return objs
+
+
+######################## Section: 1. Data Gathering ########################
+
+
+# Modality of an asset: the last '_' part of a file name containing 'sub-' (up to its first '.'),
+# for files stored inside a 'sub-' directory (e.g., 'sub-01/anat/sub-01_task-rest_bold.nii' -> 'bold')
+_MODALITY_RE = re.compile(r"sub-.*/(?=[^/]*sub-)[^/]*_([^_/.]+)[^_/]*$")
 
 
 def extract_modality_from_filename(assetname, assetpath):
@@ -69,78 +123,119 @@ def extract_modality_from_filename(assetname, assetpath):
     of the file name, separated by underscores (e.g., 'sub-01_task-rest_bold.nii' -> 'bold').
 
     Args:
-        assetname (str): The name of the file.
+        assetname (str): The name of the file (kept for compatibility, the full path is enough).
         assetpath (str): The full path of the asset.
 
     Returns:
         str: The modality if found, otherwise None.
     """
-    if "_" in assetname and "sub-" in assetname:  # Check if the file name follows the expected format
-        # Extract everything after 'sub-' and split by '/'
-        path = "sub-".join(assetpath.split("sub-")[1:])
-        if len(path.split("/")) > 1:  # If there are multiple parts in the path, assume it's valid
-            return assetname.split("_")[-1].split(".")[0]  # Extract modality from the last part of the name
-    return None  # Return None if no modality found
+    match = _MODALITY_RE.search(assetpath)  # A single scan of the path
+    return match.group(1) if match else None  # Return None if no modality found
 
 
-def assets_to_df(ds):
+# Key-value columns of the file names that are always present in the DataFrame of assets_to_df()
+ENTITY_COLUMNS = ("sub", "ses", "sample", "stain", "run")
+
+
+def assets_to_df(ds, keep_asset=None):
     """
     Convert assets from a dandiset into a structured pandas DataFrame with extracted metadata.
 
     Args:
         ds: The dandiset object obtained from the Dandi API.
+        keep_asset (callable, optional): Predicate on the path of an asset, True for the asset objects
+            to keep in asset_by_path. By default all the asset objects are kept.
 
     Returns:
         df (pandas.DataFrame): A DataFrame containing information about each asset.
-        assets (list): A list of asset objects from the dandiset.
+        asset_by_path (dict): The kept asset objects from the dandiset, keyed by their path.
     """
-    # Get the list of assets from the dataset
-    assets = list(ds.get_assets())
-    
-    # Initialize an empty list to store metadata for each asset
-    asset_info = []
-    
-    # Loop through each asset in the list
-    for asset in assets:
-        # Split the asset's path into parts (directories and file name)
-        path_parts = asset.path.split("/")
-        
-        # Extract the subject ID (subdir) from the path, if available
-        sub = extract_subject_from_path(path_parts)
-        
-        # Extract the file name from the path (the last part)
-        assetname = path_parts[-1]
-        
-        # Parse key-value pairs from the file name (e.g., 'sub-01_task-rest')
-        info = parse_asset_filename(assetname)
-        
-        # If a subject ID was found, add it to the metadata dictionary
-        if sub:
-            info["subdir"] = sub
-        
-        # Add the full path to the metadata dictionary
-        info["path"] = asset.path
-        
-        # Extract modality information (e.g., 'bold', 'T1w') from the file name
-        modality = extract_modality_from_filename(assetname, asset.path)
-        if modality:
-            info["modality"] = modality
-        
-        # Extract the file extension (e.g., 'nii', 'bvec') and add it to the dictionary
-        ext = ".".join(assetname.split(".")[1:])
-        info["extension"] = ext
-        
-        # Add the asset's modified date to the metadata dictionary
-        info["modified"] = asset.modified
-        
-        # Append the metadata dictionary for this asset to the list
-        asset_info.append(info)
-    
-    # Convert the list of asset metadata into a pandas DataFrame
-    df = pd.DataFrame(asset_info)
-    
-    # Return both the DataFrame and the original list of assets
-    return df, assets
+    # Dictionary to look up the asset objects by their path (the 'path' column of the DataFrame);
+    # the other assets are dropped as soon as their path and modified date are read
+    asset_by_path = {}
+
+    # Stream the assets from the dataset: only the path and the modified date are read, in a single pass
+    # filling one list per column; everything else is derived column-wise with pandas string operations
+    path_list, modified_list = [], []
+    for asset in ds.get_assets():
+        path_list.append(asset.path)
+        modified_list.append(asset.modified)
+        if keep_asset is None or keep_asset(asset.path):
+            asset_by_path[asset.path] = asset
+    paths = pd.Series(path_list, dtype=str)
+    modified = pd.Series(modified_list)
+
+    # Split every path into its directory part and its file name (the last part),
+    # and every file name into its stem and its extension (e.g., 'nii', 'bvec').
+    # Partitioning an empty Series gives no columns at all, so a dandiset without assets is kept as is.
+    if paths.empty:
+        dirs = assetnames = stems = extensions = paths
+    else:
+        split_paths = paths.str.rpartition("/")
+        dirs, assetnames = split_paths[0], split_paths[2]
+        split_names = assetnames.str.partition(".")
+        stems, extensions = split_names[0], split_names[2]
+
+    # Extract the subject ID (subdir) from the first directory starting with 'sub-', if available
+    subdirs = dirs.str.extract(r"(?:^|/)sub-([^/]+)", expand=False)
+
+    # Extract modality information (e.g., 'bold', 'T1w') from the last '_' part of the file name
+    modalities = paths.str.extract(_MODALITY_RE, expand=False)
+
+    # Parse key-value pairs from the file names (e.g., 'sub-01_task-rest'):
+    # one row per '_' separated token, keeping only the tokens that contain a '-'
+    tokens = stems.str.split("_").explode()
+    tokens = tokens[tokens.str.contains("-", regex=False, na=False)]
+    if tokens.empty:
+        # No key-value pair in any file name (e.g., only 'README' files): no key column to build
+        df = pd.DataFrame(index=paths.index)
+    else:
+        key_values = tokens.str.partition("-")
+        key_values = pd.DataFrame({
+            "asset": key_values.index,    # Position of the asset the token belongs to
+            "key": key_values[0].values,  # Part before the first '-'
+            "value": key_values[2].values,  # Part after the first '-'
+        })
+        # A repeated key keeps its last value, then every key becomes a column
+        key_values = key_values.drop_duplicates(["asset", "key"], keep="last")
+        df = key_values.pivot(index="asset", columns="key", values="value").reindex(paths.index)
+    # The columns used later on always exist, even for dandisets without those keys
+    df = df.reindex(columns=list(ENTITY_COLUMNS) + [key for key in df.columns if key not in ENTITY_COLUMNS])
+    df.columns.name = None
+    df.index.name = None
+
+    # Add the remaining metadata columns
+    df["subdir"] = subdirs
+    df["path"] = paths
+    # Few distinct modalities and extensions are shared by many assets, so store them as categories
+    df["modality"] = modalities.astype("category")
+    df["extension"] = extensions.astype("category")
+    df["modified"] = modified
+
+    # Return both the DataFrame and the asset objects by path
+    return df, asset_by_path
+
+
+
+def isin_mask(column, values):
+    """
+    Build the boolean mask of the rows of a column whose value is one of the given values.
+    For categorical columns the comparison is done on the integer category codes,
+    which avoids hashing every string of the column.
+
+    Parameters:
+    column (pandas.Series): The column to filter on (e.g., df['modality']).
+    values (list): The values to keep (e.g., ["SPIM"]).
+
+    Returns:
+    numpy.ndarray: A boolean array, True for the rows to keep.
+    """
+    if not isinstance(column.dtype, pd.CategoricalDtype):
+        return column.isin(values).to_numpy()
+    categories = column.cat.categories
+    # Codes of the requested values; values that are not a category match no row
+    codes = [categories.get_loc(value) for value in values if value in categories]
+    return np.isin(column.cat.codes.to_numpy(), codes)
 
 
 
@@ -149,6 +244,48 @@ def assets_to_df(ds):
 #                                                     6. Generating Stain X Sample Interactive Plots ########################
 
 
+def get_factors(column):
+    """
+    Get the factors (distinct values) of a plot axis from a DataFrame column.
+
+    Parameters:
+    column (pandas.Series): The column holding the axis values.
+
+    Returns:
+    list: The categories still in use if the column is categorical (in category order),
+          otherwise the unique values in order of appearance.
+    """
+    # Categorical columns already hold their distinct values, no need to compare every row
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column.cat.remove_unused_categories().cat.categories.tolist()
+    return column.unique().tolist()
+
+
+# Number of rectangles above which a plot is rendered with WebGL instead of the HTML canvas
+WEBGL_THRESHOLD = 5000
+
+# BokehJS loaded by every plot from the relative path static/js/ of the plots directory (see copy_bokehjs()),
+# instead of being embedded in or downloaded by each HTML file.
+PLOT_RESOURCES = Resources(mode="server", root_url="")
+
+
+@functools.lru_cache(maxsize=None)
+def get_palette(num_colors):
+    """
+    Return a palette with exactly `num_colors` colors for the plots.
+    The cached palette only depends on the number of colors.
+
+    Parameters:
+    num_colors (int): Number of colors required.
+
+    Returns:
+    tuple: A tuple of hex color codes, from Category10 for up to 10 colors and from
+           Category20 otherwise, cycled when more colors than the palette has are needed.
+    """
+    base = Category20[20] if num_colors > 10 else Category10[max(3, num_colors)]
+    return tuple(islice(cycle(base), num_colors))
+
+
 def generate_plot(data, title, save_path, interactive=True):
     """
     Generate a Bokeh plot for visualizing subject-modality or sample-stain relationships.
@@ -164,23 +301,37 @@ def generate_plot(data, title, save_path, interactive=True):
                         If False, generates a non-interactive plot.
 
     Returns:
-    None: The plot is displayed in the browser and saved to the provided `save_path`.
+    None: The plot is saved to the provided `save_path`.
     """
     
-    # Create a Bokeh ColumnDataSource from the given DataFrame.
-    # ColumnDataSource is the Bokeh format for binding data to plots.
-    source = ColumnDataSource(data)
-
     # Extract unique values for 'sample' (x-axis) and 'stain' (y-axis) from the DataFrame.
     # These unique values are used to define the range of x and y axes.
-    x_range = list(data['sample'].unique())
-    y_range = list(data['stain'].unique())
+    x_range = get_factors(data['sample'])
+    y_range = get_factors(data['stain'])
 
     # Determine the number of unique stains (or modalities) to apply distinct colors.
     num_stains = len(y_range)
     
-    # Use Category20 palette for up to 20 unique values; otherwise, cycle through Category10 palette.
-    palette = Category20[num_stains] if num_stains <= 20 else Category10[num_stains % 10]
+    # Get exactly one color per unique value.
+    palette = get_palette(num_stains)
+
+    # Color of each rectangle, computed once here rather than mapped from 'stain' in the browser
+    stain_to_color = dict(zip(y_range, palette))
+    colors = data['stain'].map(stain_to_color).to_numpy(dtype=object)
+
+    # Create a Bokeh ColumnDataSource from the given DataFrame.
+    # ColumnDataSource is the Bokeh format for binding data to plots.
+    # Only the columns used by the plot are embedded in the HTML.
+    # The columns are passed as NumPy arrays, and without the DataFrame index that Bokeh would add.
+    source_data = {col: data[col].to_numpy(dtype=object) for col in ('sample', 'stain')}
+    source_data['color'] = colors
+    if interactive:
+        # The URLs share a long constant prefix (the Neuroglancer address and configuration), which is
+        # embedded only once as url_base: each row only stores the rest of its URL ('url_tail')
+        urls = data['url'].tolist()
+        url_base = os.path.commonprefix(urls)
+        source_data['url_tail'] = np.array([url[len(url_base):] for url in urls], dtype=object)
+    source = ColumnDataSource(data=source_data)
 
     # Create the Bokeh figure object. This is where the plot settings are defined.
     p = figure(
@@ -190,8 +341,11 @@ def generate_plot(data, title, save_path, interactive=True):
         tools="tap" if interactive else "save",  # Use 'tap' tool only if interactive, otherwise just 'save' tool.
         width=1200,   # Width of the plot, adjusted to display more samples comfortably
         height=600,   # Height of the plot, adjusted to display multiple stains/modalities
-        toolbar_location="right"  # Place toolbar (e.g., save button) on the right side for better layout
+        toolbar_location="right",  # Place toolbar (e.g., save button) on the right side for better layout
+        # Render large plots on the GPU (WebGL) so their drawing time does not grow with the number of rectangles
+        output_backend="webgl" if len(data) > WEBGL_THRESHOLD else "canvas",
     )
+    p.toolbar.logo = None  # Hide the Bokeh logo in the toolbar
 
     # Add rectangles to represent each sample-stain (subject-modality) combination.
     # Rectangles represent the cells in the matrix (e.g., a specific subject with a specific modality).
@@ -201,7 +355,7 @@ def generate_plot(data, title, save_path, interactive=True):
         width=0.9,   # Set the width of each rectangle (close to 1 to fill the space, but with slight spacing)
         height=0.9,  # Set the height of each rectangle
         source=source,  # Provide the data source that contains the x, y values and possibly URLs
-        fill_color=factor_cmap('stain', palette=palette, factors=y_range),  # Assign colors based on 'stain'
+        fill_color='color',  # Use the color assigned to the 'stain' of each rectangle
         line_color=None,  # Remove borders for a cleaner look
     )
 
@@ -209,16 +363,16 @@ def generate_plot(data, title, save_path, interactive=True):
     if interactive:
         # JavaScript callback that executes when a rectangle is clicked.
         # Opens the URL associated with the clicked rectangle.
-        url_callback = CustomJS(args=dict(source=source), code="""
+        url_callback = CustomJS(args=dict(source=source, url_base=url_base), code="""
             // Get the index of the clicked rectangle
             const selected = source.selected.indices[0];  
             
-            // Retrieve the URL for the selected rectangle
-            const url = source.data.url[selected];  
+            // Retrieve the end of the URL for the selected rectangle
+            const url_tail = source.data.url_tail[selected];  
 
             // If a URL exists, open it in a new tab. Otherwise, alert the user that no URL is available.
-            if (url) {
-                window.open(url);  // Open the URL in a new window/tab
+            if (url_tail != null) {
+                window.open(url_base + url_tail);  // Open the URL, rebuilt from the shared prefix, in a new window/tab
             } else {
                 alert('No URL found for this selection.');
             }
@@ -237,89 +391,184 @@ def generate_plot(data, title, save_path, interactive=True):
     # This is only enabled if 'interactive' is True.
     if interactive:
         # The HoverTool displays tooltips when hovering over a rectangle, showing the sample, stain, and URL.
+        # The URL is rebuilt in the browser from the shared prefix and the 'url_tail' of the row.
         hover_tool = HoverTool(
-            tooltips=[("Sample", "@sample"), ("Stain", "@stain"), ("URL", "@url")],
+            tooltips=[("Sample", "@sample"), ("Stain", "@stain"), ("URL", "@url_tail{custom}")],
+            formatters={"@url_tail": CustomJSHover(args=dict(url_base=url_base), code="return url_base + value")},
             attachment="above"  # Position the tooltip above the hovered rectangle
         )
         p.add_tools(hover_tool)  # Add the hover tool to the plot
 
-    # Define the output file where the plot will be saved (HTML format).
-    output_file(save_path)
+    # Save the plot as an HTML file loading the shared BokehJS copied by copy_bokehjs(), without opening it in the browser.
+    save(p, filename=save_path, title=title, resources=PLOT_RESOURCES)
 
-    show(p)
 
 
+def copy_bokehjs(plots_dict):
+    """
+    Copy the BokehJS files loaded by PLOT_RESOURCES next to the plots, so that every plot
+    references the same local files and the browser downloads BokehJS only once for the whole dashboard.
 
-######################## Section: 5. Generating the Neuroglancer URL ########################
+    Parameters:
+    plots_dict (str): The directory where the plots are saved.
+    """
+    for js_file in PLOT_RESOURCES.js_files:
+        # 'static/js/bokeh.min.js' -> <plots_dict>/static/js/bokeh.min.js, from the BokehJS shipped with bokeh
+        dst = os.path.join(plots_dict, js_file)
+        src = os.path.join(settings.bokehjs_path(), os.path.relpath(js_file, "static"))
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        shutil.copyfile(src, dst)
 
 
-def build_url(layers, base_url):
+def render_sub(sub_name, df_sub, plots_dict):
     """
-    Helper function to build the Neuroglancer URL from a list of layers.
-    Each layer represents one stain (or dataset) in the visualization.
-    
+    Generate and save the interactive Stain X Sample plot of one sub.
+    A top-level function so that it can run in a separate process.
+
+    Parameters:
+    sub_name (str): The sub identifier (e.g., I48).
+    df_sub (pandas.DataFrame): The rows of the sub with 'sample', 'stain' and 'url' columns,
+        already sorted by sample and stain, with 'stain' as an ordered categorical column.
+    plots_dict (str): The directory where the plot is saved.
+
+    Returns:
+    str: The path of the saved plot.
+    """
+    # create the title for the plot
+    title = f"{sub_name} - Stain x Sample"
+    # path where to save the plot
+    save_path = f"{plots_dict}/{sub_name}.html"
+
+    # generate and save the interactive plot
+    generate_plot(df_sub, title, save_path, True)
+
+    return save_path
+
+
+
+######################## Section: 4. Getting the AmazonAWS URL ########################
+
+
+def get_s3_url(asset):
+    """
+    Get the AmazonAWS (S3) content URL of one asset.
+    Network errors and server errors are already retried, with a growing delay, by the DANDI API client.
+
+    Parameters:
+    asset: An asset object from the dandiset.
+
+    Returns:
+    str: The S3 URL of the asset.
+    """
+    return asset.get_content_url(regex='s3')
+
+
+def get_s3_urls(assets, max_workers=32):
+    """
+    Get the AmazonAWS (S3) content URL of every given asset.
+    Each URL is one round-trip to the DANDI API, so the requests are sent
+    from a pool of threads to overlap their network latency.
+
     Parameters:
-    layers (list): A list of layer dictionaries, each defining one stain's configuration.
+    assets (list): A list of asset objects from the dandiset.
+    max_workers (int): Maximum number of requests sent at the same time.
+
     Returns:
-    str: A fully constructed Neuroglancer URL with encoded layer configurations.
-    """
-    # Define the configuration for the Neuroglancer viewer
-    config = {
-        "dimensions": {
-            "z": [0.0000036, "m"],  # Z dimension scale (in meters per voxel)
-            "y": [0.0000036, "m"],  # Y dimension scale
-            "x": [0.0000036, "m"]   # X dimension scale
-        },
-        "layers": layers,  # All layers to be visualized (one or more)
-        "gpuMemoryLimit": 5000000000, # This sets the GPU memory limit to 5GB
-        "layout": 'yz',    # Layout of the view (along the YZ plane)
-    }
-    return base_url + quote(json.dumps(config))
+    list: The S3 URLs, in the same order as the given assets.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # map() keeps the order of the assets in the returned URLs
+        return list(executor.map(get_s3_url, assets))
+
+
+
+######################## Section: 5. Generating the Neuroglancer URL ########################
+
 
+# Neuroglancer base URL for constructing the visualization links
+NG_BASE_URL = "https://neuroglancer-demo.appspot.com/#!"
 
+# Configuration for the Neuroglancer viewer, serialized once.
+# Only the "layers" entry changes between URLs, so the URLs are built by filling it in between
+# this constant prefix and suffix instead of serializing the whole config every time.
+_CFG_PREFIX = '{"dimensions":' + json.dumps(
+    {
+        "z": [0.0000036, "m"],  # Z dimension scale (in meters per voxel)
+        "y": [0.0000036, "m"],  # Y dimension scale
+        "x": [0.0000036, "m"]   # X dimension scale
+    },
+    separators=(",", ":"),
+) + ',"layers":'
+_CFG_SUFFIX = (
+    ',"gpuMemoryLimit":5000000000'  # This sets the GPU memory limit to 5GB
+    ',"layout":"yz"}'               # Layout of the view (along the YZ plane)
+)
+
+
+@functools.lru_cache(maxsize=64)
 def get_rgb_priority_palette(num_colors):
     """
     Return a color palette with RGB colors (Red, Green, Blue) as the first three colors,
     followed by colors from Bokeh's Category20 palette for any additional stains.
+    The palette only depends on the number of colors, so it is cached.
 
     Parameters:
     num_colors (int): Number of distinct colors required.
 
     Returns:
-    list: A list of hex color codes, starting with Red, Green, and Blue.
+    tuple: A tuple of hex color codes, starting with Red, Green, and Blue.
     """
     # RGB colors (Red, Green, Blue)
-    rgb_colors = ["#FF0000", "#00FF00", "#0000FF"]  # Red, Green, Blue
+    rgb_colors = ("#FF0000", "#00FF00", "#0000FF")  # Red, Green, Blue
 
     # Use remaining colors from Category20, if needed
     if num_colors <= 3:
         return rgb_colors[:num_colors]  # Only need RGB colors
     else:
-        # Combine RGB colors with Category20 for more than 3 stains
-        return rgb_colors + list(Category20[20][:3-num_colors])  # Use remaining colors from Category20
+        # Combine RGB colors with (num_colors - 3) colors of Category20, cycled if needed, for more than 3 stains
+        return rgb_colors + tuple(islice(cycle(Category20[20]), num_colors - 3))
     
 
-def assign_shader(color, contrast_multiplier, intensity_multiplier):
+# Serialized config of a single-stain URL (see get_ng_url()), split around its two variable
+# strings: the "source" and the "name" of the layer. Equivalent to the compact JSON serialization
+# of the config with the layers [{"type": "image", "source": ..., "tab": "rendering", "shaderControls": {...}, "name": ...}].
+# The constant parts are percent-encoded once here: quote() works character by character,
+# so quoting the parts separately gives the same result as quoting the whole config.
+_SINGLE_PREFIX = quote(_CFG_PREFIX + '[{"type":"image","source":', safe='')
+_SINGLE_MID = quote(',"tab":"rendering","shaderControls":{"normalized":{"range":[0,2000]}},"name":', safe='')
+_SINGLE_SUFFIX = quote('}]' + _CFG_SUFFIX, safe='')
+
+
+def get_ng_url(sub, sample, stain, modality, url):
     """
-    Generate a GLSL shader with built-in brightness control, contrast multiplier, and intensity multiplier.
-    
+    Build the Neuroglancer URL visualizing a single stain.
+    Only the source and the name of the layer are serialized, the rest of the config is constant.
+
     Parameters:
-    color (str): The hex color of the stain (e.g., '#ff5733').
-    contrast_multiplier (float): Multiplier to adjust contrast of the intensity values.
-    intensity_multiplier (float): Multiplier to adjust overall intensity of the RGB color.
+    sub (str): Subject identifier (e.g., I48).
+    sample (str): Sample identifier for the subject (e.g., Sample02).
+    stain (str): Stain type used in imaging (e.g., NeuN).
+    modality (str): Imaging modality used (e.g., SPIM).
+    url (str): The URL pointing to the Zarr dataset of the stain.
 
     Returns:
-    str: A GLSL shader string with built-in brightness control (no external parameter).
+    str: The Neuroglancer URL of the stain.
     """
-    return f"""
+    source = encode_basestring_ascii(f"zarr://{url}")  # Use the Zarr URL as the data source
+    name = encode_basestring_ascii(f"{sub}-{sample}-{stain}-{modality}")  # Layer name
+    return NG_BASE_URL + _SINGLE_PREFIX + quote(source, safe='') + _SINGLE_MID + quote(name, safe='') + _SINGLE_SUFFIX
+
+
+# GLSL shader template used by assign_shader(); only the numeric values change between stains
+_SHADER_TMPL = """
     #uicontrol float brightness slider(min=0.0, max=100.0, default=50.0)  // Brightness control UI
     void main() {{
         // Normalize the data and adjust by contrast and brightness multipliers
-        float intensity = toNormalized(getDataValue()) * {contrast_multiplier};  // Adjust contrast
+        float intensity = toNormalized(getDataValue()) * {contrast};  // Adjust contrast
         float brightness_adjusted = intensity * (brightness / 50.0);  // Brightness adjustment, scaled around default 50
         
         // Define the RGB color based on the given hex color and apply intensity and brightness
-        vec3 result = vec3({int(color[1:3], 16) / 255.0}, {int(color[3:5], 16) / 255.0}, {int(color[5:], 16) / 255.0}) * brightness_adjusted * {intensity_multiplier};
+        vec3 result = vec3({r}, {g}, {b}) * brightness_adjusted * {intensity};
         
         // Emit the final RGB color
         emitRGB(result);
@@ -327,6 +576,78 @@ def assign_shader(color, contrast_multiplier, intensity_multiplier):
     """
 
 
+@functools.lru_cache(maxsize=None)
+def _hex_to_rgb(color):
+    """
+    Convert a hex color (e.g., '#ff5733') into its (r, g, b) components normalized to [0, 1].
+    The result is cached since the same few palette colors are converted for every sample.
+    """
+    return int(color[1:3], 16) / 255.0, int(color[3:5], 16) / 255.0, int(color[5:7], 16) / 255.0
+
+
+@functools.lru_cache(maxsize=128)
+def assign_shader(color, contrast_multiplier, intensity_multiplier):
+    """
+    Generate a GLSL shader with built-in brightness control, contrast multiplier, and intensity multiplier.
+    The shader text only depends on its arguments, so it is cached and reused across samples.
+    
+    Parameters:
+    color (str): The hex color of the stain (e.g., '#ff5733').
+    contrast_multiplier (float): Multiplier to adjust contrast of the intensity values.
+    intensity_multiplier (float): Multiplier to adjust overall intensity of the RGB color.
+
+    Returns:
+    str: A GLSL shader string with built-in brightness control (no external parameter).
+    """
+    r, g, b = _hex_to_rgb(color)
+    return _SHADER_TMPL.format(r=r, g=g, b=b, contrast=contrast_multiplier, intensity=intensity_multiplier)
+
+
+# Percent-encoded constant parts of the overlap URLs (see get_overlap_layer()), equivalent to the compact JSON
+# serialization of the config with the layers [{"type": "image", "source": ..., "tab": "rendering", "shader": ..., "name": ...}, ...]
+_OVERLAP_PREFIX = quote(_CFG_PREFIX + '[', safe='')
+_OVERLAP_SUFFIX = quote(']' + _CFG_SUFFIX, safe='')
+_LAYER_SEPARATOR = quote(',', safe='')
+_OVERLAP_LAYER_HEAD = quote('{"type":"image","source":', safe='')
+_OVERLAP_LAYER_SHADER = quote(',"tab":"rendering","shader":', safe='')
+_OVERLAP_LAYER_NAME = quote(',"name":', safe='')
+_OVERLAP_LAYER_TAIL = quote('}', safe='')
+
+
+@functools.lru_cache(maxsize=128)
+def _quoted_shader(color, contrast_multiplier, intensity_multiplier):
+    """
+    Return the shader of assign_shader() serialized as a JSON string and percent-encoded.
+    The shader is the largest part of an overlap layer and is shared by many samples, so it is cached.
+    """
+    return quote(encode_basestring_ascii(assign_shader(color, contrast_multiplier, intensity_multiplier)), safe='')
+
+
+def get_overlap_layer(sub, sample, stain, modality, url, color, contrast_multiplier, intensity_multiplier):
+    """
+    Build the percent-encoded JSON of one stain layer of an overlap URL, with a distinct color shader.
+    The layers of a (sub, sample) group are joined into the overlap URL by get_ng_urls().
+
+    Parameters:
+    sub, sample, stain, modality (str): Identifiers of the stain, used for the layer name.
+    url (str): The URL pointing to the Zarr dataset of the stain.
+    color (str): The hex color of the stain (e.g., '#ff5733').
+    contrast_multiplier (float): Multiplier to adjust contrast of the intensity values.
+    intensity_multiplier (float): Multiplier to adjust overall intensity of the RGB color.
+
+    Returns:
+    str: The percent-encoded JSON of the layer.
+    """
+    source = encode_basestring_ascii(f"zarr://{url}")  # Zarr URL for the data source
+    name = encode_basestring_ascii(f"{sub}-{sample}-{stain}-{modality}")  # Layer name
+    return (
+        _OVERLAP_LAYER_HEAD + quote(source, safe='')
+        + _OVERLAP_LAYER_SHADER + _quoted_shader(color, contrast_multiplier, intensity_multiplier)
+        + _OVERLAP_LAYER_NAME + quote(name, safe='')
+        + _OVERLAP_LAYER_TAIL
+    )
+
+
 def get_ng_urls(df, contrast_multiplier=2.0, intensity_multiplier=1.5):
     """
     Generate Neuroglancer URLs for each stain and update the 'url' column
@@ -340,6 +661,8 @@ def get_ng_urls(df, contrast_multiplier=2.0, intensity_multiplier=1.5):
         - 'stain': Stain type used in imaging (e.g., NeuN, Nissl).
         - 'modality': Imaging modality used (e.g., SPIM).
         - 'url': The base URL pointing to the Zarr dataset for this subject-sample-stain combination.
+        Only the first row of each (sub, sample, stain, modality) combination is used, so the
+        caller is responsible for selecting the desired dataset (e.g., resolution) beforehand.
     contrast_multiplier (float): A factor to adjust contrast (brightness scaling) for the stains.
     intensity_multiplier (float): A factor to adjust the color intensity in the shaders.
 
@@ -348,87 +671,95 @@ def get_ng_urls(df, contrast_multiplier=2.0, intensity_multiplier=1.5):
                       to contain both individual and overlap Neuroglancer URLs with specific color assignment.
     """
     
-    # Neuroglancer base URL for constructing the visualization link
-    base_url = "https://neuroglancer-demo.appspot.com/#!"
+    # Use floats so that every call shares the cached shaders of assign_shader()
+    contrast_multiplier, intensity_multiplier = float(contrast_multiplier), float(intensity_multiplier)
+
+    # Drop repeated (sub, sample, stain, modality) rows, which would only produce identical layers
+    df = df.drop_duplicates(['sub', 'sample', 'stain', 'modality']).reset_index(drop=True)
 
-    # List to store all rows for the final DataFrame, including overlap rows
-    final_rows = []
+    # Column-wise lists for the final DataFrame, including overlap rows
+    final_cols = {"sub": [], "sample": [], "stain": [], "modality": [], "url": []}
+
+    def append_row(sub, sample, stain, modality, url):
+        # Append one row to the final output, one value per column
+        final_cols["sub"].append(sub)            # Subject identifier
+        final_cols["sample"].append(sample)      # Sample identifier
+        final_cols["stain"].append(stain)        # Stain type
+        final_cols["modality"].append(modality)  # Imaging modality
+        final_cols["url"].append(url)            # Generated Neuroglancer URL
 
     # Iterate over groups of (sub, sample) to generate both individual and overlap URLs
     for (sub, sample), group in df.groupby(['sub', 'sample']):
-        # For each stain in the current (sub, sample) group, generate individual URLs
-        for _, row in group.iterrows():
-            # Define the layer configuration for this stain
-            layer = {
-                "type": "image",  # Layer type is image (since we are visualizing images)
-                "source": f"zarr://{row['url']}",  # Use the Zarr URL as the data source
-                "tab": "rendering",  # Specify the tab in Neuroglancer (rendering tab)
-                "shaderControls": {"normalized": {"range": [0, 2000]}},  # Adjust range for brightness
-                "name": f"{row['sub']}-{row['sample']}-{row['stain']}-{row['modality']}"  # Layer name
-            }
-            # Build the URL for this individual stain layer
-            url = build_url([layer], base_url)
-            # Append the row to the final output, but update the 'url' with the generated Neuroglancer URL
-            final_rows.append({
-                "sub": row['sub'],        # Subject identifier
-                "sample": row['sample'],  # Sample identifier
-                "stain": row['stain'],    # Stain type
-                "modality": row['modality'],  # Imaging modality
-                "url": url                # Updated with generated Neuroglancer URL
-            })
-        
+        # Plain per-stain values of the group, avoiding a pandas Series per row
+        rows = list(zip(
+            group['sub'].to_numpy(),
+            group['sample'].to_numpy(),
+            group['stain'].to_numpy(),
+            group['modality'].to_numpy(),
+            group['url'].to_numpy(),
+        ))
+
         # Generate a list of distinct colors for each stain in the group
-        colors = get_rgb_priority_palette(len(group))
-        
-        # After individual URLs, create the overlap URL for this (sub, sample) group
-        layers = []  # List to store layers for all stains in this sample
-        for i, (_, row) in enumerate(group.iterrows()):
-            # Create a layer for each stain in the current (sub, sample) group, with a distinct color shader
-            layer = {
-                "type": "image",  # Layer type is image
-                "source": f"zarr://{row['url']}",  # Zarr URL for the data source
-                "tab": "rendering",  # Specify rendering tab
-                "shader": assign_shader(colors[i], contrast_multiplier, intensity_multiplier),  # Assign the stain to a specific color shader
-                "name": f"{row['sub']}-{row['sample']}-{row['stain']}-{row['modality']}"  # Layer name
-            }
-            layers.append(layer)  # Add this layer to the list of layers
+        colors = get_rgb_priority_palette(len(rows))
+
+        # In a single pass, generate the individual URL of each stain and
+        # collect its colored layer for the overlap URL of this (sub, sample) group
+        layers = []  # List to store the encoded layers for all stains in this sample
+        for i, (row_sub, row_sample, row_stain, row_modality, row_url) in enumerate(rows):
+            # Build the URL for this individual stain and add its row to the final output
+            append_row(row_sub, row_sample, row_stain, row_modality,
+                       get_ng_url(row_sub, row_sample, row_stain, row_modality, row_url))
+
+            # Create the layer of this stain for the overlap URL, with a distinct color shader
+            layers.append(get_overlap_layer(row_sub, row_sample, row_stain, row_modality, row_url,
+                                            colors[i], contrast_multiplier, intensity_multiplier))
 
         # Build the overlap URL that combines all layers for this (sub, sample)
-        overlap_url = build_url(layers, base_url)
-
-        # Append a new row for the overlap visualization (indicating it in 'stain' as 'OVERLAP')
-        final_rows.append({
-            "sub": sub,           # Subject identifier
-            "sample": sample,     # Sample identifier
-            "stain": "Overlap",   # Special label to indicate this is an overlap URL
-            "modality": group['modality'].iloc[0],  # Get the modality (same for all in this group)
-            "url": overlap_url    # Update the 'url' field with the overlap URL
-        })
+        overlap_url = NG_BASE_URL + _OVERLAP_PREFIX + _LAYER_SEPARATOR.join(layers) + _OVERLAP_SUFFIX
 
-    # Convert the list of rows into a DataFrame and return
-    return pd.DataFrame(final_rows)
+        # Append a new row for the overlap visualization (indicating it in 'stain' as 'Overlap');
+        # the modality is the same for all stains in this group
+        append_row(sub, sample, "Overlap", rows[0][3], overlap_url)
+
+    # Convert the columns into a DataFrame and return
+    return pd.DataFrame(final_cols)
 
 
 
 ######################## Main function 
 
 
-def main():
+def main(force=False):
+    """
+    Generate the plots and the Interactive Plot Selector HTML page of the dandiset.
+
+    Args:
+        force (bool): If True, recompute the cached steps instead of loading them from ./objs.
+    """
     
     ##################### Variables
 
     # Creating esstential directories
+    # directory to save the cached objects
+    object_dict = "./objs"
     # plots directory
     plots_dict = "./plots"
-    # Create the directory 
-    try:
-        os.mkdir(plots_dict)
-    except:
-        print(f"Note: {plots_dict} to store plots objects already exist.")
+    # Create the directories, if they do not already exist
+    for directory in (object_dict, plots_dict):
+        os.makedirs(directory, exist_ok=True)
+    # Copy BokehJS once, shared by all the plots
+    copy_bokehjs(plots_dict)
 
     # Dandi dataset ID
     dandi_set = "000026"
 
+    # Modality and extension of the data refined in step 3 (the data of the Stain X Sample plots)
+    refined_modality = "SPIM"
+    refined_extension = "ome.zarr"
+
+    # Number of S3 URLs requested at the same time (tunable with the S3_URL_WORKERS environment variable)
+    s3_url_workers = int(os.environ.get("S3_URL_WORKERS", 32))
+
     # API call
     api = "https://api.dandiarchive.org/api"
     dandi_api = DandiAPIClient(api)
@@ -440,8 +771,26 @@ def main():
 
     print("Gathering Data.")
 
+    # The network-bound steps are cached per dandiset version and its last modification,
+    # so reruns skip the network as long as the dandiset did not change
+    modified = dandi_dataset.version.modified.strftime("%Y%m%dT%H%M%S")
+    cache_key = f"{dandi_set}_{dandi_dataset.version_id}_{modified}_{CACHE_VERSION}"
+    # The cached asset objects and URLs only cover the refined data, so their files also depend on it
+    refined_cache_key = f"{cache_key}_{refined_modality}_{refined_extension}"
+
+    # Only the assets of the data refined in step 3 are needed to get their URL in step 4
+    def is_refined_asset(path):
+        assetname = path.rpartition("/")[2]
+        return (assetname.partition(".")[2] == refined_extension
+                and extract_modality_from_filename(assetname, path) == refined_modality)
+
     # data gathering
-    df, assets = assets_to_df(dandi_dataset)
+    # (the DataFrame is cached as Feather, the asset objects are pickled)
+    df, asset_by_path = load_or_compute(
+        (f"{object_dict}/rawData_{cache_key}.feather", f"{object_dict}/assets_{refined_cache_key}.pkl"),
+        lambda: assets_to_df(dandi_dataset, keep_asset=is_refined_asset),
+        force,
+    )
 
     print("\t\t1/7 Done!")
 
@@ -459,10 +808,14 @@ def main():
 
 
     # selecting data  with specific modaility
-    df_modXsub = df_modXsub[df_modXsub['modality'].isin(selected_modalities)].copy()
+    df_modXsub = df_modXsub[isin_mask(df_modXsub['modality'], selected_modalities)].copy()
      # Rename for consistency in the function for generate_plot()
     df_modXsub.rename(columns={"sub": "sample", "modality": "stain"}, inplace=True) 
 
+    # Use categories for the plotted columns, so their factors are known without scanning the rows
+    for col in ('sample', 'stain'):
+        df_modXsub[col] = df_modXsub[col].astype('category')
+
     # sort the data on the bases of sample and each sample on the bases of stain
     df_modXsub = df_modXsub.sort_values(by=['sample', 'stain'], ascending=[True, True])
 
@@ -481,10 +834,9 @@ def main():
 
     print("Refining to SPIM Data with ome.zarr Extensions.")
 
-    # Refining the data
-    df_refined = df[(df['modality'].isin(["SPIM"])) & (df['extension']=='ome.zarr')].copy()
-    # Only taking the sub, sample, stain and modality columns
-    df_refined = df_refined[['sub', 'sample', 'stain', 'modality']]
+    # Refining the data, only taking the sub, sample, stain and modality columns (a single new DataFrame)
+    refined = isin_mask(df['modality'], [refined_modality]) & isin_mask(df['extension'], [refined_extension])
+    df_refined = df.loc[refined, ['sub', 'sample', 'stain', 'modality']]
 
     print("\t\t3/7 Done!")
 
@@ -493,11 +845,22 @@ def main():
 
     print("Getting the AmazonAWS URL")
 
-    # create a copy
-    df_aaws = df_refined.copy()
+    def get_aaws(assets):
+        # add the url of each row to the refined data (no copy), from its asset looked up by the path of the row
+        df_refined['url'] = get_s3_urls(
+            [assets[path] for path in df.loc[df_refined.index, 'path']],
+            max_workers=s3_url_workers,
+        )
+        # Feather only stores a default index, which is all the next steps need
+        return df_refined.reset_index(drop=True)
+
+    # the asset objects are passed as an argument (not captured by get_aaws), so they can be freed below
+    df_aaws = load_or_compute(
+        f"{object_dict}/df_aaws_{refined_cache_key}.feather", functools.partial(get_aaws, asset_by_path), force
+    )
 
-    # get the url for each row based on the index from the assests dataset
-    df_aaws['url'] = [assets[i].get_content_url(regex='s3') for i in df_aaws.index]
+    # the asset objects are not needed anymore, free them
+    del asset_by_path
 
     print("\t\t4/7 Done!")
 
@@ -506,11 +869,14 @@ def main():
 
     print("Generating the Neuroglancer URL")
 
-    # sort based on sub 
-    df_final = df_aaws.sort_values(by='sub')
-
     # Generate the individual and overlap NeuroGlancer URLs
-    df_final = get_ng_urls(df_final, contrast_multiplier=100.0, intensity_multiplier=1.0)
+    # (get_ng_urls groups the rows by sub and sample, so no sorting is needed beforehand)
+    df_final = get_ng_urls(df_aaws, contrast_multiplier=100.0, intensity_multiplier=1.0)
+
+    # Use categories for the repeated labels, storing each distinct value only once
+    # ('stain' becomes an ordered categorical in step 6)
+    for col in ('sub', 'sample', 'modality'):
+        df_final[col] = df_final[col].astype('category')
 
     print("\t\t5/7 Done!")
 
@@ -519,42 +885,40 @@ def main():
 
     print("Generating Stain X Sample Interactive Plots")
 
-    # getting all subs
-    subs = df_final['sub'].unique()
-
     # contains the location info of the genrated plots
     plots_loc = dict()
     # adding the modaility x strin plot path
     plots_loc['Modailty X Subject'] = modXsub_plt_path
 
-    # for every sub
-    for sub_name in subs:
-        # get all the rows of that particular sub, for example I48
-        df_sub = df_final[(df_final['sub'] == sub_name)].copy()
-
-        # sort the data on the bases of sample and each sample on the 
-        # bases of stain however have 'Overlap' at the top.
-        # Get unique stain values excluding 'Overlap' and then sort them
-        unique_stains = sorted(df_sub['stain'].unique())
-        if 'Overlap' in unique_stains:
-            unique_stains.remove('Overlap')
-
-        # Define 'overlap' as the top priority for the 'stain' column
-        df_sub['stain'] = pd.Categorical(df_sub['stain'], categories=['Overlap']+unique_stains , ordered=True)
-
-        # Now sort by 'sample' and 'stain'
-        df_sub = df_sub.sort_values(by=['sample', 'stain'], ascending=[True, False])
-
-        # create the title for the plot
-        title = f"{sub_name} - Stain x Sample"
-        # path where to save the plot
-        save_path = f"{plots_dict}/{sub_name}.html"
-        # save the path info
+    # sort the data on the bases of sample and each sample on the 
+    # bases of stain however have 'Overlap' at the top.
+    # Get unique stain values excluding 'Overlap' and then sort them
+    unique_stains = sorted(set(df_final['stain']) - {'Overlap'})
+
+    # The category order is the order of the y-axis from bottom to top,
+    # so define 'Overlap' as the last category to have it at the top
+    df_final['stain'] = pd.Categorical(df_final['stain'], categories=unique_stains[::-1]+['Overlap'], ordered=True)
+
+    # Now sort by 'sub', 'sample' and 'stain' once, so that the rows of every sub are already in order
+    df_final = df_final.sort_values(by=['sub', 'sample', 'stain'], kind='stable').reset_index(drop=True)
+
+    # getting all subs and the positions of the rows of every sub, for example I48, in a single groupby pass
+    df_plot = df_final[['sample', 'stain', 'url']]
+    subs, subs_dfs = [], []
+    for sub_name, positions in df_final.groupby('sub', observed=True).indices.items():
+        subs.append(sub_name)
+        # the rows of a sub are contiguous after the sort, so a slice of them is enough
+        subs_dfs.append(df_plot.iloc[positions[0]:positions[-1] + 1])
+
+    # the plots are independent of each other, so they are generated and saved in parallel processes,
+    # one per CPU core but never more processes than subs
+    with ProcessPoolExecutor(max_workers=max(1, min(len(subs), os.cpu_count() or 1))) as executor:
+        save_paths = list(executor.map(render_sub, subs, subs_dfs, repeat(plots_dict)))
+
+    # save the path info
+    for sub_name, save_path in zip(subs, save_paths):
         plots_loc[sub_name] = save_path
 
-        # generate and save the interactive plot
-        generate_plot(df_sub, title, save_path, True)
-
     print("\t\t6/7 Done!")
 
 
@@ -564,10 +928,10 @@ def main():
 
     # directory where the template is located
     template_dir = os.path.dirname(os.path.abspath("__file__"))
-    # Load the template environment
-    env = Environment(loader=FileSystemLoader(template_dir))
-    # Load the template
-    template = env.get_template('temp/template.html')
+    # Load the template directly; a single template needs no loader environment.
+    # Jinja2 is kept since the template loops over the subs to build the dropdown options.
+    with open(os.path.join(template_dir, 'temp', 'template.html'), encoding='utf-8') as template_file:
+        template = Template(template_file.read())
 
     # Render the template with the plots_loc data
     rendered_html = template.render(subs=plots_loc)
@@ -583,4 +947,6 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Create the DANDI Interactive Plot Selector HTML page.")
+    parser.add_argument("--force", action="store_true", help="ignore the cached data in ./objs and fetch it again")
+    main(force=parser.parse_args().force)